@@ -13,10 +13,12 @@ from . import prosthetic_fitter
 from . import ui_panel
 
 def register():
+    prosthetic_fitter.register()
     ui_panel.register()
 
 def unregister():
     ui_panel.unregister()
+    prosthetic_fitter.unregister()
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
@@ -1,123 +1,494 @@
+from collections import OrderedDict
+
 import bpy
-import mathutils
-from mathutils import Vector
+import numpy as np
+from bpy.app.handlers import persistent
+from mathutils import Matrix, Vector
+from mathutils.bvhtree import BVHTree
+
+
+# Landmark empties, in the row order used by get_landmarks
+HAND_LANDMARKS = ("Hand_Wrist_L", "Hand_Wrist_R", "Hand_Palm")
+PROSTHETIC_LANDMARKS = ("Prosthetic_Wrist_L", "Prosthetic_Wrist_R", "Prosthetic_Palm")
+LANDMARK_NAMES = HAND_LANDMARKS + PROSTHETIC_LANDMARKS
+
+# Names of the scene objects and data the add-on works with
+SCAN_NAME = "HandScan"
+PROSTHETIC_NAME = "Prosthetic"
+SOCKET_MODIFIER = "SocketFit"
+SOCKET_MATERIAL = "InnerSocket"
+SOCKET_VG = "Socket_VG"
+
+
+# --- OBJECT LOOKUP CACHE ---
+# Direct references to named objects so repeated lookups skip the name search.
+# Cleared on file load and undo/redo, where Blender reallocates its data, and after
+# every depsgraph update: objects deleted with the delete operator are freed without
+# invalidating their Python wrappers, so a ReferenceError cannot be relied on.
+_object_cache = {}
+
+def _valid_cached_object(name):
+    obj = _object_cache.get(name)
+    if obj is not None:
+        try:
+            if obj.name == name:
+                return obj
+        except ReferenceError:
+            pass
+        del _object_cache[name]
+    return None
+
+def get_cached_object(name):
+    obj = _valid_cached_object(name)
+    if obj is None:
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            _object_cache[name] = obj
+    return obj
+
+def get_cached_objects(names):
+    """
+    Resolves several names at once, reusing cached objects. Names that are not
+    found are left out.
+    """
+    found = {}
+    for name in names:
+        obj = get_cached_object(name)
+        if obj is not None:
+            found[name] = obj
+    return found
+
+@persistent
+def _clear_object_cache(*args):
+    _object_cache.clear()
 
 
 def get_scene_objects():
-    scan_obj = bpy.data.objects.get("HandScan")
-    prosthetic_obj = bpy.data.objects.get("Prosthetic")
+    found = get_cached_objects((SCAN_NAME, PROSTHETIC_NAME))
+    scan_obj = found.get(SCAN_NAME)
+    prosthetic_obj = found.get(PROSTHETIC_NAME)
     if not scan_obj: raise ValueError("Scene error: Could not find 'HandScan'.")
     if not prosthetic_obj: raise ValueError("Scene error: Could not find 'Prosthetic'.")
     return scan_obj, prosthetic_obj
 
 def get_landmarks(scan_obj, prosthetic_obj):
-    landmark_names = [
-        "Hand_Wrist_L", "Hand_Wrist_R", "Hand_Palm",
-        "Prosthetic_Wrist_L", "Prosthetic_Wrist_R", "Prosthetic_Palm"
-    ]
-    landmarks = {}
-    for name in landmark_names:
-        obj = bpy.data.objects.get(name)
-        if not obj: raise ValueError(f"Scene error: Could not find landmark '{name}'.")
-        landmarks[name] = obj.matrix_world.translation
+    """
+    Returns the world positions of the six landmarks as one (6, 3) array,
+    with rows in the order of LANDMARK_NAMES.
+    """
+    found = get_cached_objects(LANDMARK_NAMES)
+    missing = [name for name in LANDMARK_NAMES if name not in found]
+    if missing:
+        raise ValueError(f"Scene error: Could not find landmark(s) {', '.join(repr(n) for n in missing)}.")
+    landmarks = np.empty((len(LANDMARK_NAMES), 3), dtype=np.float64)
+    for i, name in enumerate(LANDMARK_NAMES):
+        landmarks[i] = found[name].matrix_world.translation
     return landmarks
 
 
-def auto_create_socket_vg(prosthetic_obj):
-    vg_name = "Socket_VG"
-    mat_name = "InnerSocket"
+def get_face_soa(mesh):
+    """
+    Reads per-face material indices and the loop -> vertex table of a mesh as flat
+    arrays (material_index, loop_start, loop_total, loop vertex_index).
+    """
+    n_polys = len(mesh.polygons)
+    mat_idx = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", mat_idx)
+    loop_start = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    loop_total = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    loops_v = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops_v)
+    return mat_idx, loop_start, loop_total, loops_v
+
+
+def get_socket_verts(prosthetic_obj):
+    """
+    Returns the sorted indices of the vertices used by InnerSocket faces.
+    Only reads mesh data.
+    """
+    mat_name = SOCKET_MATERIAL
     mesh = prosthetic_obj.data
-    try:
-        socket_mat_index = prosthetic_obj.material_slots.find(mat_name)
-    except ValueError:
+    socket_mat_index = prosthetic_obj.material_slots.find(mat_name)
+    if socket_mat_index < 0:
         raise ValueError(f"Preparation error: Prosthetic is missing the '{mat_name}' material.")
+    # Bulk-read face and loop data instead of walking mesh.polygons in Python
+    mat_idx, loop_start, loop_total, loops_v = get_face_soa(mesh)
+    # Loops are stored contiguously per face, so expand the face mask to a loop mask
+    loop_mask = np.repeat(mat_idx == socket_mat_index, loop_total)
+    # Scatter into a per-vertex bitmap to dedupe without sorting or hashing
+    in_socket = np.zeros(len(mesh.vertices), dtype=bool)
+    in_socket[loops_v[loop_mask]] = True
+    return np.flatnonzero(in_socket)
+
+def auto_create_socket_vg(prosthetic_obj, socket_verts):
+    vg_name = SOCKET_VG
     if vg_name in prosthetic_obj.vertex_groups:
         prosthetic_obj.vertex_groups.remove(prosthetic_obj.vertex_groups[vg_name])
     socket_vg = prosthetic_obj.vertex_groups.new(name=vg_name)
-    verts_to_assign = [v_idx for face in mesh.polygons if face.material_index == socket_mat_index for v_idx in face.vertices]
-    socket_vg.add(list(set(verts_to_assign)), 1.0, 'REPLACE')
+    socket_vg.add(socket_verts.tolist(), 1.0, 'REPLACE')
     print(f"Automatically created and assigned '{vg_name}' vertex group.")
 
 
-def calculate_and_apply_transform(prosthetic_obj, landmarks):
+# Fit results keyed by the landmark positions (rounded to 1e-6), so re-running the
+# fit with unchanged landmarks (e.g. after an undo) reuses the previous solve.
+_FIT_CACHE_SIZE = 16
+_fit_cache = OrderedDict()
+
+def compute_fit_matrix(landmarks):
     """
-    Calculates and applies transformations by anchoring the prosthetic's wrist
-    to the hand's wrist, ensuring the wrist landmarks align perfectly.
+    Computes the wrist-centric matrix that maps the prosthetic landmarks onto the
+    hand landmarks. Pure math with no scene access, so it can be re-evaluated
+    cheaply. Returns (mat_final, scale_xy, scale_z).
+    """
+    key = tuple(np.round(landmarks, 6).ravel().tolist())
+    if key in _fit_cache:
+        _fit_cache.move_to_end(key)
+    else:
+        _fit_cache[key] = _solve_fit_matrix(landmarks)
+        if len(_fit_cache) > _FIT_CACHE_SIZE:
+            _fit_cache.popitem(last=False)
+    mat_final, scale_xy, scale_z = _fit_cache[key]
+    return mat_final.copy(), scale_xy, scale_z
+
+
+def _landmark_basis(right_vec, fwd_vec):
+    """
+    Orthonormal frame (as matrix columns) from the wrist axis and the palm
+    direction, or None if they are degenerate or parallel.
     """
-    # Isolate landmark vectors
-    h_wl, h_wr, h_p = landmarks["Hand_Wrist_L"], landmarks["Hand_Wrist_R"], landmarks["Hand_Palm"]
-    p_wl, p_wr, p_p = landmarks["Prosthetic_Wrist_L"], landmarks["Prosthetic_Wrist_R"], landmarks["Prosthetic_Palm"]
+    right_len = np.linalg.norm(right_vec)
+    if right_len < 1e-9:
+        return None
+    x_axis = right_vec / right_len
+    y_axis = fwd_vec - x_axis * (fwd_vec @ x_axis)
+    y_len = np.linalg.norm(y_axis)
+    if y_len < 1e-9:
+        return None
+    y_axis = y_axis / y_len
+    return np.column_stack((x_axis, y_axis, np.cross(x_axis, y_axis)))
+
+
+def _solve_fit_matrix(landmarks):
+    # Pair up hand (row 0) and prosthetic (row 1) landmarks so both are processed at once
+    wrist_l, wrist_r, palm = landmarks[[0, 3]], landmarks[[1, 4]], landmarks[[2, 5]]
 
     # 1. DEFINE WRIST CENTERS AND ORIENTATION VECTORS
-    hand_wrist_center = (h_wl + h_wr) / 2.0
-    pros_wrist_center = (p_wl + p_wr) / 2.0
-    
-    hand_right_vec = (h_wr - h_wl).normalized()
-    hand_fwd_vec = (h_p - hand_wrist_center).normalized()
-    
-    pros_right_vec = (p_wr - p_wl).normalized()
-    pros_fwd_vec = (p_p - pros_wrist_center).normalized()
+    wrist_centers = (wrist_l + wrist_r) / 2.0
+    right_vecs = wrist_r - wrist_l
+    fwd_vecs = palm - wrist_centers
 
     # 2. CALCULATE SCALE AND ROTATION
-    # XY scale is based on wrist width
-    hand_wrist_dist = (h_wr - h_wl).length
-    pros_wrist_dist = (p_wr - p_wl).length
-    scale_xy = hand_wrist_dist / pros_wrist_dist if pros_wrist_dist != 0 else 1.0
-
-    # Z scale is based on palm length
-    hand_palm_len = (h_p - hand_wrist_center).length
-    pros_palm_len = (p_p - pros_wrist_center).length
-    scale_z = hand_palm_len / pros_palm_len if pros_palm_len != 0 else 1.0
+    # XY scale is based on wrist width, Z scale on palm length
+    wrist_dists = np.linalg.norm(right_vecs, axis=1)
+    palm_lens = np.linalg.norm(fwd_vecs, axis=1)
+    scale_xy = wrist_dists[0] / wrist_dists[1] if wrist_dists[1] != 0 else 1.0
+    scale_z = palm_lens[0] / palm_lens[1] if palm_lens[1] != 0 else 1.0
 
-    # Calculate rotation to align the prosthetic's orientation to the hand's
-    rot_diff = pros_right_vec.rotation_difference(hand_right_vec)
+    # Calculate rotation to align the prosthetic's orientation to the hand's:
+    # map the prosthetic's (right, forward) frame onto the hand's so the palm
+    # direction is matched too, not just the wrist axis
+    hand_wrist_center, pros_wrist_center = Vector(wrist_centers[0]), Vector(wrist_centers[1])
+    hand_basis = _landmark_basis(right_vecs[0], fwd_vecs[0])
+    pros_basis = _landmark_basis(right_vecs[1], fwd_vecs[1])
+    if hand_basis is not None and pros_basis is not None:
+        mat_linear = Matrix((hand_basis @ pros_basis.T).tolist())
+    else:
+        # Palm landmark in line with the wrist: only the wrist axis is defined
+        mat_linear = Vector(right_vecs[1]).rotation_difference(Vector(right_vecs[0])).to_matrix()
 
-    # 3. BUILD THE TRANSFORMATION MATRIX 
+    # 3. BUILD THE TRANSFORMATION MATRIX
     # This process applies scale and rotation around the wrist center, not the object origin.
-    
-    # Start with a blank matrix
-    mat_final = mathutils.Matrix.Identity(4)
-    
-    # Create matrices for each operation
-    mat_trans_to_origin = mathutils.Matrix.Translation(-pros_wrist_center)
-    mat_scale = mathutils.Matrix.Scale(scale_xy, 4, (1, 0, 0)) @ mathutils.Matrix.Scale(scale_xy, 4, (0, 1, 0)) @ mathutils.Matrix.Scale(scale_z, 4, (0, 0, 1))
-    mat_rot = rot_diff.to_matrix().to_4x4()
-    mat_trans_to_target = mathutils.Matrix.Translation(hand_wrist_center)
-
-    # Combine the matrices in the correct order: move to origin, scale, rotate, move to target
-    mat_final = mat_trans_to_target @ mat_rot @ mat_scale @ mat_trans_to_origin
-    
+
+    # Linear part is rotation @ diag(scale_xy, scale_xy, scale_z): scale the rotation's columns
+    mat_linear.col[0] *= scale_xy
+    mat_linear.col[1] *= scale_xy
+    mat_linear.col[2] *= scale_z
+
+    # Translation moves the scaled/rotated prosthetic wrist center onto the hand wrist center
+    mat_final = mat_linear.to_4x4()
+    mat_final.translation = hand_wrist_center - mat_linear @ pros_wrist_center
+
+    return mat_final, scale_xy, scale_z
+
+
+def calculate_and_apply_transform(prosthetic_obj, landmarks):
+    """
+    Calculates and applies transformations by anchoring the prosthetic's wrist
+    to the hand's wrist, ensuring the wrist landmarks align perfectly.
+    """
+    mat_final, scale_xy, scale_z = compute_fit_matrix(landmarks)
+
+    # Re-fitting an already fitted prosthetic yields an identity transform; skip it
+    # to avoid float drift and a needless depsgraph update
+    if np.allclose(np.array(mat_final), np.eye(4), rtol=0.0, atol=1e-6):
+        print("Prosthetic already aligned to landmarks; transform skipped.")
+        return
+
     # Apply the final combined transformation to the prosthetic
     prosthetic_obj.matrix_world = mat_final @ prosthetic_obj.matrix_world
     
     print(f"Applied Wrist-Centric Transform: Scale:(XY:{scale_xy:.2f}, Z:{scale_z:.2f})")
 
+# --- ICP refinement ---
+def _skew(v):
+    return np.array([[0.0, -v[2], v[1]], [v[2], 0.0, -v[0]], [-v[1], v[0], 0.0]])
+
+def _rotvec_to_matrix(w):
+    # Rodrigues: R = I + sin(t) K + (1 - cos(t)) K^2 for unit axis skew K
+    theta = np.linalg.norm(w)
+    if theta < 1e-12:
+        return np.eye(3)
+    k = _skew(w / theta)
+    return np.eye(3) + np.sin(theta) * k + (1.0 - np.cos(theta)) * (k @ k)
+
+def _matrix_to_rotvec(rot):
+    theta = np.arccos(np.clip((np.trace(rot) - 1.0) / 2.0, -1.0, 1.0))
+    vee = np.array([rot[2, 1] - rot[1, 2], rot[0, 2] - rot[2, 0], rot[1, 0] - rot[0, 1]])
+    if theta < 1e-9:
+        return 0.5 * vee
+    return theta / (2.0 * np.sin(theta)) * vee
+
+def _nearest_on_scan(bvh, scan_to_world, points):
+    """
+    Nearest scan surface points and unit normals for world-space points, using a
+    BVHTree built in the scan's local space. Returns (hit mask, targets, normals),
+    with targets and normals in world space for the hit points only.
+    """
+    world_to_scan = np.linalg.inv(scan_to_world)
+    local = points @ world_to_scan[:3, :3].T + world_to_scan[:3, 3]
+    nearest = [bvh.find_nearest(Vector(q)) for q in local]
+    hits = np.array([hit[0] is not None for hit in nearest], dtype=bool)
+    targets = np.array([hit[0] for hit in nearest if hit[0] is not None]).reshape(-1, 3)
+    normals = np.array([hit[1] for hit in nearest if hit[0] is not None]).reshape(-1, 3)
+    targets = targets @ scan_to_world[:3, :3].T + scan_to_world[:3, 3]
+    # Normals transform with the inverse transpose, which keeps them correct under
+    # non-uniform scan scale
+    normals = normals @ world_to_scan[:3, :3]
+    normals /= np.linalg.norm(normals, axis=1)[:, None]
+    return hits, targets, normals
+
+def _icp_step(nearest, points, pose):
+    """
+    One point-to-plane ICP step from a (rotation vector, translation) pose.
+    `nearest` maps moved points to (hit mask, targets, normals).
+    Returns the updated pose and the point-to-plane energy at the input pose,
+    which is infinite when too few points found the surface.
+    """
+    rot = _rotvec_to_matrix(pose[:3])
+    moved = points @ rot.T + pose[3:]
+    hits, targets, normals = nearest(moved)
+    if hits.sum() < 6:
+        return pose, np.inf
+    moved = moved[hits]
+
+    # Drop far correspondences (off the socket region of the scan) as outliers
+    dists = np.linalg.norm(targets - moved, axis=1)
+    keep = dists <= 3.0 * np.median(dists) + 1e-9
+    moved, targets, normals = moved[keep], targets[keep], normals[keep]
+
+    # Linearized point-to-plane: minimize sum(((q + w x q + t - p) . n)^2) over (w, t)
+    residuals = np.einsum("ij,ij->i", targets - moved, normals)
+    jacobian = np.hstack((np.cross(moved, normals), normals))
+    delta = np.linalg.lstsq(jacobian, residuals, rcond=None)[0]
+
+    # Compose the increment onto the current pose
+    rot_delta = _rotvec_to_matrix(delta[:3])
+    new_pose = np.concatenate((
+        _matrix_to_rotvec(rot_delta @ rot),
+        rot_delta @ pose[3:] + delta[3:],
+    ))
+    return new_pose, float(residuals @ residuals)
+
+def _solve_icp(nearest, points, max_iterations, anderson_depth, tolerance):
+    """
+    Anderson-accelerated ICP over the 6-DOF pose, treating one ICP step as a
+    fixed-point map. Returns (pose, iterations, energy).
+    """
+    pose = np.zeros(6)
+    step, energy = _icp_step(nearest, points, pose)
+    poses, steps = [pose], [step]
+    iterations = 1
+    while iterations < max_iterations and np.linalg.norm(step - pose) > tolerance:
+        candidate = step
+        if len(poses) > 1:
+            residuals = np.array(steps) - np.array(poses)
+            d_res = np.diff(residuals, axis=0)
+            d_steps = np.diff(np.array(steps), axis=0)
+            gamma = np.linalg.lstsq(d_res.T, residuals[-1], rcond=None)[0]
+            candidate = step - d_steps.T @ gamma
+        candidate_step, candidate_energy = _icp_step(nearest, points, candidate)
+        iterations += 1
+        if candidate is not step and candidate_energy > energy:
+            # Accelerated pose made things worse: fall back to the plain ICP step
+            candidate = step
+            candidate_step, candidate_energy = _icp_step(nearest, points, candidate)
+            iterations += 1
+            poses, steps = [], []
+        pose, step, energy = candidate, candidate_step, candidate_energy
+        poses.append(pose)
+        steps.append(step)
+        poses, steps = poses[-(anderson_depth + 1):], steps[-(anderson_depth + 1):]
+    return pose, iterations, energy
+
+def refine_fit_icp(prosthetic_obj, scan_obj, socket_verts, max_iterations=15,
+                   sample_count=2000, anderson_depth=5, tolerance=1e-6):
+    """
+    Refines the landmark alignment with a rigid, Anderson-accelerated
+    point-to-plane ICP of the socket vertices against the scan surface.
+    """
+    if len(socket_verts) < 6:
+        print("Skipped ICP refinement: too few socket vertices.")
+        return
+    if len(socket_verts) > sample_count:
+        socket_verts = socket_verts[np.linspace(0, len(socket_verts) - 1, sample_count).astype(np.int64)]
+
+    # Solve in world space so the correction stays rigid even if the scan is
+    # non-uniformly scaled; only the nearest-point queries go through scan space
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    bvh = BVHTree.FromObject(scan_obj, depsgraph)
+    scan_to_world = np.array(scan_obj.matrix_world)
+    pros_to_world = np.array(prosthetic_obj.matrix_world)
+    mesh = prosthetic_obj.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", coords)
+    points = coords.reshape(-1, 3)[socket_verts] @ pros_to_world[:3, :3].T + pros_to_world[:3, 3]
+
+    pose, iterations, energy = _solve_icp(
+        lambda moved: _nearest_on_scan(bvh, scan_to_world, moved),
+        points, max_iterations, anderson_depth, tolerance,
+    )
+    if not np.isfinite(energy):
+        print("Skipped ICP refinement: socket vertices did not reach the scan surface.")
+        return
+
+    correction = np.eye(4)
+    correction[:3, :3] = _rotvec_to_matrix(pose[:3])
+    correction[:3, 3] = pose[3:]
+    prosthetic_obj.matrix_world = Matrix(correction.tolist()) @ prosthetic_obj.matrix_world
+    print(f"Applied ICP refinement: {iterations} iterations, energy {energy:.3e}")
+
 # --- Conform_socket function ---
 def conform_socket(prosthetic_obj, scan_obj):
     bpy.context.view_layer.objects.active = prosthetic_obj
     prosthetic_obj.select_set(True)
-    modifier_name = "SocketFit"
-    for mod in prosthetic_obj.modifiers:
-        if mod.name == modifier_name:
-            prosthetic_obj.modifiers.remove(mod)
-    shrinkwrap_mod = prosthetic_obj.modifiers.new(name=modifier_name, type='SHRINKWRAP')
+    modifier_name = SOCKET_MODIFIER
+    # Reuse an existing SocketFit shrinkwrap; re-creating it rebuilds the modifier stack
+    shrinkwrap_mod = prosthetic_obj.modifiers.get(modifier_name)
+    if shrinkwrap_mod is not None and shrinkwrap_mod.type != 'SHRINKWRAP':
+        prosthetic_obj.modifiers.remove(shrinkwrap_mod)
+        shrinkwrap_mod = None
+    if shrinkwrap_mod is None:
+        shrinkwrap_mod = prosthetic_obj.modifiers.new(name=modifier_name, type='SHRINKWRAP')
     shrinkwrap_mod.target = scan_obj
-    shrinkwrap_mod.vertex_group = "Socket_VG"
+    shrinkwrap_mod.vertex_group = SOCKET_VG
     # shrinkwrap_mod.offset = 0.003  original offset
     shrinkwrap_mod.offset = bpy.context.scene.socket_offset_mm / 1000.0
     print(f"Successfully applied '{modifier_name}' modifier.")
 
 # --- THE MAIN CONTROLLER  ---
+# State of the last completed fit, so an unchanged scene is not fitted twice:
+# (_fit_state_key result, prosthetic world matrix, landmark positions) after the fit.
+_last_fit_state = None
+
+def _fit_state_key(scan_obj, socket_verts):
+    icp_refine = bpy.context.scene.icp_refine
+    scan_geometry = None
+    if icp_refine:
+        # ICP fits against the scan surface, so in-place scan edits change the result
+        mesh = scan_obj.data
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        scan_geometry = hash(coords.tobytes())
+    return (
+        scan_obj.as_pointer(),
+        scan_obj.data.as_pointer(),
+        tuple(v for row in scan_obj.matrix_world for v in row),
+        socket_verts.tobytes(),
+        icp_refine,
+        scan_geometry,
+    )
+
+def _fit_is_current(key, landmarks, prosthetic_obj, scan_obj):
+    if _last_fit_state is None:
+        return False
+    last_key, last_matrix, last_landmarks = _last_fit_state
+    modifier = prosthetic_obj.modifiers.get(SOCKET_MODIFIER)
+    return (
+        key == last_key
+        and np.array_equal(np.array(prosthetic_obj.matrix_world), last_matrix)
+        and np.allclose(landmarks, last_landmarks, rtol=0.0, atol=1e-5)
+        and modifier is not None
+        and modifier.target == scan_obj
+    )
+
 def run_fitting_process():
+    """
+    Runs the full fit. Returns True when the fit was applied and False when it
+    was skipped because nothing changed since the last fit. Raises ValueError
+    when the scene is not set up for fitting.
+    """
+    global _last_fit_state
     try:
         scan_obj, prosthetic_obj = get_scene_objects()
         print("Found HandScan and Prosthetic objects.")
-        auto_create_socket_vg(prosthetic_obj)
+        socket_verts = get_socket_verts(prosthetic_obj)
         landmarks = get_landmarks(scan_obj, prosthetic_obj)
         print("Found all required landmarks.")
+        key = _fit_state_key(scan_obj, socket_verts)
+        if _fit_is_current(key, landmarks, prosthetic_obj, scan_obj):
+            print("Fit is already up to date; skipped.")
+            return False
+        auto_create_socket_vg(prosthetic_obj, socket_verts)
+        pre_fit_world = np.array(prosthetic_obj.matrix_world)
         calculate_and_apply_transform(prosthetic_obj, landmarks)
+        if bpy.context.scene.icp_refine:
+            refine_fit_icp(prosthetic_obj, scan_obj, socket_verts)
         conform_socket(prosthetic_obj, scan_obj)
+        # Landmark empties parented to the prosthetic moved rigidly with it: derive
+        # their new positions from the applied matrix rather than re-evaluating
+        post_fit_world = np.array(prosthetic_obj.matrix_world)
+        fit_delta = post_fit_world @ np.linalg.inv(pre_fit_world)
+        found = get_cached_objects(LANDMARK_NAMES)
+        for i, name in enumerate(LANDMARK_NAMES):
+            if found[name].parent == prosthetic_obj:
+                landmarks[i] = fit_delta[:3, :3] @ landmarks[i] + fit_delta[:3, 3]
+        _last_fit_state = (key, post_fit_world, landmarks)
         print("\n--- Fitting Process Completed Successfully ---")
+        return True
     except ValueError as e:
         print(f"ERROR: {e}")
-        print("--- Fitting Process Aborted ---")
\ No newline at end of file
+        print("--- Fitting Process Aborted ---")
+        raise
+
+@persistent
+def _reset_fit_state(*args):
+    # The fit key holds as_pointer() values, which a newly loaded file can reuse
+    global _last_fit_state
+    _last_fit_state = None
+
+
+# --- REGISTRATION ---
+_cache_handlers = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+    bpy.app.handlers.depsgraph_update_post,
+)
+
+def register():
+    for handlers in _cache_handlers:
+        if _clear_object_cache not in handlers:
+            handlers.append(_clear_object_cache)
+    if _reset_fit_state not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_reset_fit_state)
+
+def unregister():
+    for handlers in _cache_handlers:
+        if _clear_object_cache in handlers:
+            handlers.remove(_clear_object_cache)
+    if _reset_fit_state in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_reset_fit_state)
+    _object_cache.clear()
+    _reset_fit_state()
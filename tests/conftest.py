@@ -0,0 +1,66 @@
+"""
+Loads prosthetic_fitter outside Blender for the pure NumPy helpers.
+
+When bpy/mathutils are not importable, minimal stand-ins are registered that
+cover only what the add-on modules touch at import time. They are installed
+when this file loads because pytest imports the add-on's __init__.py (the
+repository root is a package) before running any test.
+"""
+import importlib.util
+import pathlib
+import sys
+import types
+
+import pytest
+
+ADDON_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _install_blender_stand_ins():
+    try:
+        import bpy  # noqa: F401
+        import mathutils  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    handlers = types.ModuleType("bpy.app.handlers")
+    handlers.persistent = lambda func: func
+    handlers.load_post, handlers.undo_post, handlers.redo_post = [], [], []
+    handlers.depsgraph_update_post = []
+    app = types.ModuleType("bpy.app")
+    app.handlers = handlers
+    bpy_types = types.ModuleType("bpy.types")
+    bpy_types.Operator = bpy_types.Panel = object
+    bpy = types.ModuleType("bpy")
+    bpy.app = app
+    bpy.types = bpy_types
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Matrix = mathutils.Vector = tuple
+    bvhtree = types.ModuleType("mathutils.bvhtree")
+    bvhtree.BVHTree = object
+    mathutils.bvhtree = bvhtree
+
+    sys.modules.update({
+        "bpy": bpy,
+        "bpy.app": app,
+        "bpy.app.handlers": handlers,
+        "bpy.types": bpy_types,
+        "bmesh": types.ModuleType("bmesh"),
+        "mathutils": mathutils,
+        "mathutils.bvhtree": bvhtree,
+    })
+
+
+_install_blender_stand_ins()
+
+
+@pytest.fixture(scope="session")
+def fitter():
+    spec = importlib.util.spec_from_file_location(
+        "prosthetic_fitter", ADDON_DIR / "prosthetic_fitter.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
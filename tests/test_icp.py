@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+
+def plane_nearest(moved):
+    """Nearest points and normals on the z = 0 plane."""
+    targets = moved.copy()
+    targets[:, 2] = 0.0
+    normals = np.tile([0.0, 0.0, 1.0], (len(moved), 1))
+    return np.ones(len(moved), dtype=bool), targets, normals
+
+
+@pytest.mark.parametrize("rotvec", [
+    [0.0, 0.0, 0.0],
+    [1e-10, 0.0, 0.0],
+    [0.3, 0.1, -0.2],
+    [0.0, -1.5, 0.0],
+    [2.0, 1.0, 0.5],
+])
+def test_rotvec_round_trip(fitter, rotvec):
+    rotvec = np.array(rotvec)
+    rot = fitter._rotvec_to_matrix(rotvec)
+    np.testing.assert_allclose(rot @ rot.T, np.eye(3), atol=1e-12)
+    np.testing.assert_allclose(fitter._matrix_to_rotvec(rot), rotvec, atol=1e-9)
+
+
+def test_icp_converges_onto_plane(fitter):
+    grid = np.linspace(-0.05, 0.05, 11)
+    xs, ys = np.meshgrid(grid, grid)
+    plane_points = np.column_stack((xs.ravel(), ys.ravel(), np.zeros(xs.size)))
+    tilt = fitter._rotvec_to_matrix(np.array([0.08, -0.05, 0.0]))
+    points = plane_points @ tilt.T + np.array([0.0, 0.0, 0.01])
+
+    pose, iterations, energy = fitter._solve_icp(
+        plane_nearest, points, max_iterations=15, anderson_depth=5, tolerance=1e-9
+    )
+
+    moved = points @ fitter._rotvec_to_matrix(pose[:3]).T + pose[3:]
+    assert np.abs(moved[:, 2]).max() < 1e-8
+    assert iterations < 15
+    assert energy < 1e-12
+
+
+def test_icp_step_without_enough_hits_is_not_scored_as_optimal(fitter):
+    def no_hits(moved):
+        return np.zeros(len(moved), dtype=bool), np.empty((0, 3)), np.empty((0, 3))
+
+    pose = np.zeros(6)
+    new_pose, energy = fitter._icp_step(no_hits, np.ones((10, 3)), pose)
+    assert new_pose is pose
+    assert energy == np.inf
+
+
+class TiltedPlaneBVH:
+    """Scan-space BVH stand-in for the plane x + z = 0."""
+    normal = np.array([1.0, 0.0, 1.0]) / np.sqrt(2.0)
+
+    def find_nearest(self, co):
+        co = np.asarray(co, dtype=float)
+        return co - (co @ self.normal) * self.normal, self.normal, 0, 0.0
+
+
+def test_nearest_on_scan_keeps_normals_under_non_uniform_scale(fitter):
+    scan_to_world = np.eye(4)
+    scan_to_world[:3, :3] = fitter._rotvec_to_matrix(np.array([0.3, 0.0, 0.0])) @ np.diag([2.0, 1.0, 0.5])
+    scan_to_world[:3, 3] = [0.1, -0.2, 0.3]
+    linear = scan_to_world[:3, :3]
+    points = np.random.default_rng(0).normal(scale=0.05, size=(50, 3))
+
+    hits, targets, normals = fitter._nearest_on_scan(TiltedPlaneBVH(), scan_to_world, points)
+
+    assert hits.all()
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1.0)
+    for in_plane in ([0.0, 1.0, 0.0], [1.0, 0.0, -1.0]):
+        np.testing.assert_allclose(normals @ (linear @ in_plane), 0.0, atol=1e-12)
+    np.testing.assert_allclose((targets - scan_to_world[:3, 3]) @ normals[0], 0.0, atol=1e-12)
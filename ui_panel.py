@@ -1,6 +1,26 @@
+import math
+from collections import deque
+
 import bpy
 import bmesh  
-from .prosthetic_fitter import run_fitting_process
+import numpy as np
+from .prosthetic_fitter import (
+    HAND_LANDMARKS, PROSTHETIC_LANDMARKS, PROSTHETIC_NAME, SCAN_NAME,
+    SOCKET_MATERIAL, SOCKET_MODIFIER, SOCKET_VG,
+    run_fitting_process,
+)
+
+# Mesh face count above which material assignment goes through foreach_set in
+# Object Mode. Both paths visit every face; below this size the BMesh loop is cheaper
+# than the two mode switches, above it the Python loop is the slower of the two.
+BULK_ASSIGN_MIN_FACES = 512
+
+def _socket_fit_modifier():
+    """Returns the Prosthetic's SocketFit modifier, or None."""
+    # Plain lookup: draw runs on every redraw, so it must never touch a
+    # reference that could be stale
+    prosthetic_obj = bpy.data.objects.get(PROSTHETIC_NAME)
+    return prosthetic_obj.modifiers.get(SOCKET_MODIFIER) if prosthetic_obj else None
 
 # --- OPERATORS ---
 
@@ -8,21 +28,19 @@ class PROSTHETIC_OT_CreateLandmarks(bpy.types.Operator):
     bl_idname = "prosthetic.create_landmarks"
     bl_label = "Create Landmarks"
     def execute(self, context):
-        scan_obj = bpy.data.objects.get("HandScan")
-        prosthetic_obj = bpy.data.objects.get("Prosthetic")
+        scan_obj = bpy.data.objects.get(SCAN_NAME)
+        prosthetic_obj = bpy.data.objects.get(PROSTHETIC_NAME)
         if not scan_obj or not prosthetic_obj:
             self.report({'ERROR'}, "Name objects 'HandScan' and 'Prosthetic'.")
             return {'CANCELLED'}
-        landmarks_to_create = {
-            "Hand_Wrist_L": scan_obj, "Hand_Wrist_R": scan_obj, "Hand_Palm": scan_obj,
-            "Prosthetic_Wrist_L": prosthetic_obj, "Prosthetic_Wrist_R": prosthetic_obj, "Prosthetic_Palm": prosthetic_obj,
-        }
-        for name, parent_obj in landmarks_to_create.items():
-            if not bpy.data.objects.get(name):
-                new_empty = bpy.data.objects.new(name, None)
-                new_empty.location = parent_obj.location
-                new_empty.parent = parent_obj
-                context.scene.collection.objects.link(new_empty)
+        existing = set(bpy.data.objects.keys())
+        for names, parent_obj in ((HAND_LANDMARKS, scan_obj), (PROSTHETIC_LANDMARKS, prosthetic_obj)):
+            for name in names:
+                if name not in existing:
+                    new_empty = bpy.data.objects.new(name, None)
+                    new_empty.location = parent_obj.location
+                    new_empty.parent = parent_obj
+                    context.scene.collection.objects.link(new_empty)
         self.report({'INFO'}, "Created landmark Empties.")
         return {'FINISHED'}
 
@@ -32,8 +50,10 @@ class PROSTHETIC_OT_FitObject(bpy.types.Operator):
     bl_label = "Fit Prosthetic to Scan"
     def execute(self, context):
         try:
-            run_fitting_process()
-            context.scene.socket_offset_mm = 3.0
+            if run_fitting_process():
+                context.scene.socket_offset_mm = 3.0
+            else:
+                self.report({'INFO'}, "Fit is already up to date.")
             return {'FINISHED'}
         except ValueError as e:
             self.report({'ERROR'}, str(e))
@@ -43,12 +63,23 @@ class PROSTHETIC_OT_ApplyFit(bpy.types.Operator):
     bl_idname = "prosthetic.apply_fit"
     bl_label = "Apply and Finalize Fit"
     def execute(self, context):
-        prosthetic_obj = bpy.data.objects.get("Prosthetic")
-        if prosthetic_obj and "SocketFit" in prosthetic_obj.modifiers:
-            # Ensure the object is active for the operator
-            bpy.context.view_layer.objects.active = prosthetic_obj
-            prosthetic_obj.select_set(True)
-            bpy.ops.object.modifier_apply(modifier="SocketFit")
+        prosthetic_obj = bpy.data.objects.get(PROSTHETIC_NAME)
+        if prosthetic_obj and SOCKET_MODIFIER in prosthetic_obj.modifiers:
+            # modifier_apply refuses shared or linked mesh data; give the prosthetic its own copy
+            if prosthetic_obj.data.users > 1 or prosthetic_obj.data.library:
+                prosthetic_obj.data = prosthetic_obj.data.copy()
+            # modifier_apply skips modifiers disabled in the viewport ("Toggle Deformation")
+            prosthetic_obj.modifiers[SOCKET_MODIFIER].show_viewport = True
+            if hasattr(context, "temp_override"):
+                # Point the operator at the prosthetic without touching the user's selection
+                with context.temp_override(object=prosthetic_obj, active_object=prosthetic_obj,
+                                           selected_objects=[prosthetic_obj]):
+                    bpy.ops.object.modifier_apply(modifier=SOCKET_MODIFIER)
+            else:
+                # Blender < 3.2: ensure the object is active for the operator
+                bpy.context.view_layer.objects.active = prosthetic_obj
+                prosthetic_obj.select_set(True)
+                bpy.ops.object.modifier_apply(modifier=SOCKET_MODIFIER)
             self.report({'INFO'}, "Fit has been applied. Prosthetic is now an independent object.")
             return {'FINISHED'}
         else:
@@ -67,77 +98,103 @@ class PROSTHETIC_OT_BakeFitToNewObject(bpy.types.Operator):
     bl_label = "Create Socket Shrinkwrap Object"
 
     def execute(self, context):
-        src_obj = bpy.data.objects.get("Prosthetic")
-        if not src_obj or "SocketFit" not in src_obj.modifiers:
+        src_obj = bpy.data.objects.get(PROSTHETIC_NAME)
+        if not src_obj or SOCKET_MODIFIER not in src_obj.modifiers:
             self.report({'ERROR'}, "Could not find 'Prosthetic' object with 'SocketFit' modifier.")
             return {'CANCELLED'}
 
         # Ensure we're in Object Mode for duplication / modifier application
-        if bpy.ops.object.mode_set.poll():
+        if context.mode != 'OBJECT' and bpy.ops.object.mode_set.poll():
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        # Duplicate object and its mesh data, linking to the same collections.
-        result_obj = src_obj.copy()
-        result_obj.data = src_obj.data.copy()
+        # Build the fitted mesh straight from the evaluated Prosthetic, so no
+        # intermediate mesh copy or modifier_apply on a duplicate is needed.
+        # SocketFit is forced on for the evaluation in case deformation is toggled off.
+        modifier = src_obj.modifiers[SOCKET_MODIFIER]
+        was_visible = modifier.show_viewport
+        modifier.show_viewport = True
+        depsgraph = context.evaluated_depsgraph_get()
+        eval_obj = src_obj.evaluated_get(depsgraph)
+        fitted_mesh = bpy.data.meshes.new_from_object(
+            eval_obj, preserve_all_data_layers=True, depsgraph=depsgraph
+        )
+        modifier.show_viewport = was_visible
+
+        result_obj = bpy.data.objects.new(src_obj.name + "_SocketResult", fitted_mesh)
+        result_obj.matrix_world = src_obj.matrix_world.copy()
+        # Blender 3.0+ keeps vertex group names on the mesh, so the new mesh already
+        # has them. Older versions keep them on the object: recreate any missing
+        # ones in the same order so the deform weights keep their meaning.
+        for vg in src_obj.vertex_groups:
+            if vg.name not in result_obj.vertex_groups:
+                result_obj.vertex_groups.new(name=vg.name)
         if src_obj.users_collection:
             for col in src_obj.users_collection:
                 col.objects.link(result_obj)
         else:
             context.scene.collection.objects.link(result_obj)
-        result_obj.name = src_obj.name + "_SocketResult"
 
-        # Make the new object active and apply the SocketFit modifier on it.
-        for o in context.view_layer.objects:
+        # Make the new object the active selection.
+        for o in context.selected_objects:
             o.select_set(False)
-        bpy.context.view_layer.objects.active = result_obj
+        context.view_layer.objects.active = result_obj
         result_obj.select_set(True)
 
-        if "SocketFit" not in result_obj.modifiers:
-            self.report(
-                {'WARNING'},
-                "Duplicate object did not inherit 'SocketFit' modifier; "
-                "shrinkwrap result could not be baked."
-            )
-            return {'CANCELLED'}
-
-        # Apply the SocketFit modifier so the mesh is actually deformed.
-        bpy.ops.object.modifier_apply(modifier="SocketFit")
-
         # Now trim the mesh down to JUST the socket region that the
         # shrinkwrap acted on (InnerSocket / Socket_VG), so the
         # resulting object contains only the interior fitted shape.
 
         # Prefer isolating by InnerSocket material; fall back to Socket_VG vertex group.
-        inner_mat_index = result_obj.material_slots.find("InnerSocket")
+        inner_mat_index = result_obj.material_slots.find(SOCKET_MATERIAL)
         used_strategy = None
 
         if inner_mat_index != -1:
-            # Use material selection
-            if bpy.ops.object.mode_set.poll():
-                bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='DESELECT')
-            result_obj.active_material_index = inner_mat_index
-            bpy.ops.object.material_slot_select()
-            # Invert selection and delete everything that is NOT the socket
-            bpy.ops.mesh.select_all(action='INVERT')
-            bpy.ops.mesh.delete(type='FACE')
-            bpy.ops.object.mode_set(mode='OBJECT')
+            # Delete every face that does not use the InnerSocket material
+            # directly in BMesh, without entering Edit Mode.
+            me = result_obj.data
+            mat_idx = np.empty(len(me.polygons), dtype=np.int32)
+            me.polygons.foreach_get("material_index", mat_idx)
+            kill_idx = np.flatnonzero(mat_idx != inner_mat_index)
+            bm = bmesh.new()
+            bm.from_mesh(me)
+            bm.faces.ensure_lookup_table()
+            kill = [bm.faces[i] for i in kill_idx.tolist()]
+            bmesh.ops.delete(bm, geom=kill, context='FACES')
+            bm.to_mesh(me)
+            bm.free()
+            me.update()
             used_strategy = "material"
         else:
             # Try vertex group
-            vg = result_obj.vertex_groups.get("Socket_VG")
+            vg = result_obj.vertex_groups.get(SOCKET_VG)
             if vg:
-                if bpy.ops.object.mode_set.poll():
-                    bpy.ops.object.mode_set(mode='EDIT')
-                bpy.ops.mesh.select_all(action='DESELECT')
-                bpy.ops.mesh.select_mode(type='VERT')
-                bpy.ops.object.vertex_group_set_active(group=vg.name)
-                bpy.ops.object.vertex_group_select()
-                bpy.ops.mesh.select_all(action='INVERT')
-                bpy.ops.mesh.delete(type='VERT')
-                bpy.ops.object.mode_set(mode='OBJECT')
+                me = result_obj.data
+                vg_index = vg.index
+                keep = np.zeros(len(me.vertices), dtype=bool)
+                for v in me.vertices:
+                    for g in v.groups:
+                        if g.group == vg_index:
+                            keep[v.index] = True
+                            break
+                bm = bmesh.new()
+                bm.from_mesh(me)
+                bm.verts.ensure_lookup_table()
+                kill = [bm.verts[i] for i in np.flatnonzero(~keep).tolist()]
+                bmesh.ops.delete(bm, geom=kill, context='VERTS')
+                bm.to_mesh(me)
+                bm.free()
+                me.update()
                 used_strategy = "vertex_group"
 
+        if used_strategy and result_obj.vertex_groups:
+            # Drop vertex groups that no longer hold any of the surviving vertices
+            used = np.zeros(len(result_obj.vertex_groups), dtype=bool)
+            for v in result_obj.data.vertices:
+                for g in v.groups:
+                    used[g.group] = True
+            for i in reversed(np.flatnonzero(~used).tolist()):
+                result_obj.vertex_groups.remove(result_obj.vertex_groups[i])
+
         if not used_strategy:
             self.report(
                 {'WARNING'},
@@ -162,11 +219,34 @@ class PROSTHETIC_OT_SelectSocket(bpy.types.Operator):
             self.report({'ERROR'}, "Must be in Edit Mode with one face selected.")
             return {'CANCELLED'}
         threshold = context.scene.selection_threshold
-        try:
-            bpy.ops.mesh.select_similar(type='FACE_NORMAL', threshold=threshold)
-        except Exception as e:
-            self.report({'ERROR'}, f"Selection failed. Make sure you are in Edit Mode with a face selected. {e}")
+        me = context.active_object.data
+        bm = bmesh.from_edit_mesh(me)
+        seed = bm.select_history.active
+        if not isinstance(seed, bmesh.types.BMFace):
+            seed = next((f for f in bm.faces if f.select), None)
+        if seed is None:
+            self.report({'ERROR'}, "Selection failed. Make sure you are in Edit Mode with a face selected.")
             return {'CANCELLED'}
+
+        # Grow the selection from the seed face across shared edges, keeping faces whose
+        # normal is within the threshold (a fraction of 180 degrees, as in Select Similar).
+        # Only the connected region is visited, not every face of the mesh.
+        min_dot = math.cos(threshold * math.pi)
+        seed_normal = seed.normal.copy()
+        bm.faces.index_update()
+        visited = bytearray(len(bm.faces))
+        visited[seed.index] = 1
+        queue = deque((seed,))
+        while queue:
+            face = queue.popleft()
+            face.select_set(True)
+            for edge in face.edges:
+                for other in edge.link_faces:
+                    if (not visited[other.index] and not other.hide
+                            and other.normal.dot(seed_normal) >= min_dot):
+                        visited[other.index] = 1
+                        queue.append(other)
+        bmesh.update_edit_mesh(me, loop_triangles=False, destructive=False)
         self.report({'INFO'}, "Selection complete.")
         return {'FINISHED'}
 
@@ -186,33 +266,45 @@ class PROSTHETIC_OT_AssignSocketMaterial(bpy.types.Operator):
             return {'CANCELLED'}
 
         # Get the material slot index for "InnerSocket"
-        try:
-            inner_socket_index = obj.material_slots.find("InnerSocket")
-        except ValueError:
+        inner_socket_index = obj.material_slots.find(SOCKET_MATERIAL)
+        if inner_socket_index < 0:
             self.report({'ERROR'}, "Material 'InnerSocket' not found. Please create it.")
             return {'CANCELLED'}
 
-        # Get the mesh data using bmesh
         me = obj.data
-        bm = bmesh.from_edit_mesh(me)
-
-        # Find selected faces
-        selected_faces = [f for f in bm.faces if f.select]
-
-        if not selected_faces:
+        if me.total_face_sel == 0:
             self.report({'WARNING'}, "No faces were selected.")
             return {'CANCELLED'}
 
-        # Assign the new material index to all selected faces
-        
-        for face in selected_faces:
-            face.material_index = inner_socket_index
-        
-        # Update the mesh and free the bmesh data
-        bmesh.update_edit_mesh(me)
-        bm.free()
+        if len(me.polygons) > BULK_ASSIGN_MIN_FACES:
+            # Large meshes: one bulk write in Object Mode instead of a Python loop over all faces
+            bpy.ops.object.mode_set(mode='OBJECT')
+            n_polys = len(me.polygons)
+            selected = np.empty(n_polys, dtype=bool)
+            me.polygons.foreach_get("select", selected)
+            mat_idx = np.empty(n_polys, dtype=np.int32)
+            me.polygons.foreach_get("material_index", mat_idx)
+            mat_idx[selected] = inner_socket_index
+            me.polygons.foreach_set("material_index", mat_idx)
+            me.update()
+            bpy.ops.object.mode_set(mode='EDIT')
+            face_count = int(selected.sum())
+        else:
+            # Get the mesh data using bmesh
+            bm = bmesh.from_edit_mesh(me)
+
+            # Assign the new material index to the selected faces in one pass
+            face_count = 0
+            for face in bm.faces:
+                if face.select:
+                    face.material_index = inner_socket_index
+                    face_count += 1
 
-        self.report({'INFO'}, f"Assigned 'InnerSocket' to {len(selected_faces)} faces.")
+            # Only material indices changed: skip the triangulation and topology
+            # rebuild. The edit-mode BMesh is owned by Blender, so it is not freed here.
+            bmesh.update_edit_mesh(me, loop_triangles=False, destructive=False)
+
+        self.report({'INFO'}, f"Assigned 'InnerSocket' to {face_count} faces.")
         return {'FINISHED'}
 
 
@@ -244,24 +336,27 @@ class PROSTHETIC_PT_FittingPanel(bpy.types.Panel):
         box.label(text="Step 1: Setup", icon='TOOL_SETTINGS')
         box.operator("prosthetic.create_landmarks")
         box.label(text="Step 2: Execution", icon='PLAY')
+        box.prop(scene, "icp_refine")
         box.operator("prosthetic.fit_object")
-        prosthetic_obj = bpy.data.objects.get("Prosthetic")
-        if prosthetic_obj and "SocketFit" in prosthetic_obj.modifiers:
-            modifier = prosthetic_obj.modifiers["SocketFit"]
+        modifier = _socket_fit_modifier()
+        if modifier:
             sub_box = box.box()
             sub_box.label(text="Step 3: Adjustments", icon='MODIFIER')
             sub_box.prop(modifier, "show_viewport", text="Toggle Deformation")
             sub_box.prop(scene, "socket_offset_mm", text="Socket Offset (mm)")
-            sub_box = box.box()
             sub_box.label(text="Step 4: Finalize", icon='CHECKMARK')
             sub_box.operator("prosthetic.apply_fit", text="Apply Fit On Prosthetic")
             sub_box.operator("prosthetic.bake_fit_to_new_object", text="Create Fitted Copy")
 
 # --- CUSTOM PROPERTY & REGISTRATION ---
 def update_offset(self, context):
-    prosthetic_obj = bpy.data.objects.get("Prosthetic")
-    if prosthetic_obj and "SocketFit" in prosthetic_obj.modifiers:
-        prosthetic_obj.modifiers["SocketFit"].offset = context.scene.socket_offset_mm / 1000.0
+    modifier = _socket_fit_modifier()
+    if modifier:
+        offset = context.scene.socket_offset_mm / 1000.0
+        # Skip only writes that would store the identical float32 value, so the
+        # shrinkwrap is not re-evaluated for nothing
+        if modifier.offset != float(np.float32(offset)):
+            modifier.offset = offset
 classes = (
     PROSTHETIC_OT_CreateLandmarks,
     PROSTHETIC_OT_FitObject,
@@ -282,13 +377,20 @@ def register():
     )
     bpy.types.Scene.selection_threshold = bpy.props.FloatProperty(
         name="Selection Threshold",
-        description="Angle to use for 'Select Similar by Normal'",
+        description="Normal angle (fraction of 180 degrees) for growing the socket selection",
         default=0.1, min=0.0, max=1.0
     )
+    bpy.types.Scene.icp_refine = bpy.props.BoolProperty(
+        name="Refine Fit (ICP)",
+        description="Refine the landmark alignment by fitting the inner socket to the scan surface",
+        default=False
+    )
 def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     if hasattr(bpy.types.Scene, 'socket_offset_mm'):
         del bpy.types.Scene.socket_offset_mm
     if hasattr(bpy.types.Scene, 'selection_threshold'):
-        del bpy.types.Scene.selection_threshold
\ No newline at end of file
+        del bpy.types.Scene.selection_threshold
+    if hasattr(bpy.types.Scene, 'icp_refine'):
+        del bpy.types.Scene.icp_refine
\ No newline at end of file